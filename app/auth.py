@@ -1,15 +1,21 @@
 import os
-from fastapi import APIRouter, Request, Form, Depends, Response, HTTPException
+import json
+import hashlib
+import threading
+from collections import namedtuple
+from cachetools import TTLCache
+from fastapi import APIRouter, Request, Form, Depends, Response, HTTPException, BackgroundTasks
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.responses import PlainTextResponse
-from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from app.security import hash_password, verify_password, password_needs_rehash
 from app.db import get_db
 from app.models import User, Tier
 from app.utils import normalize_email, send_email
+from app.templating import templates
+from app.logging_config import get_logger
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,12 +23,18 @@ load_dotenv()
 SESSION_SECRET = os.getenv("SESSION_SECRET", "dev-session-secret")
 APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:8000")
 ONBOARDING_SECRET = os.getenv("ONBOARDING_SECRET", "dev-onboard-secret")
+# Computed once: whether cookies should carry the Secure flag
+SECURE_COOKIE = APP_BASE_URL.startswith("https://")
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+
+logger = get_logger("app.auth")
 
 # --- Token helpers ---
 serializer = URLSafeTimedSerializer(ONBOARDING_SECRET)
+# Session cookies are signed with the session secret, matching the
+# SessionMiddleware configuration; onboarding/magic tokens keep their own
+session_serializer = URLSafeTimedSerializer(SESSION_SECRET)
 def sign_activation_token(email: str) -> str:
     return serializer.dumps(email, salt="onboarding")
 def verify_activation_token(token: str, max_age=604800) -> str:
@@ -33,7 +45,17 @@ def verify_magic_token(token: str, max_age=900) -> str:
     return serializer.loads(token, salt="magic-login", max_age=max_age)
 
 # --- Onboarding email (called from webhook service) ---
-def send_onboarding_email(email: str, tier: Tier):
+def _send_email_safe(to_email: str, subject: str, html: str):
+    # Background tasks run after the response has gone out; a mail-server
+    # failure here must be logged, never raised
+    try:
+        send_email(to_email, subject, html)
+    except Exception as e:
+        logger.error(f"Onboarding email to {to_email} failed: {e}")
+
+def send_onboarding_email(email: str, tier: Tier, background_tasks: BackgroundTasks = None):
+    # Token generation stays synchronous; the SMTP round trip is deferred
+    # to a background task when the caller provides one.
     token = sign_activation_token(email)
     link = f"{APP_BASE_URL}/auth/activate?token={token}"
     html = f"""
@@ -42,7 +64,10 @@ def send_onboarding_email(email: str, tier: Tier):
     <p>To finish signup, <a href='{link}'>activate your account</a> and set your password.</p>
     <p>If you did not sign up, you can ignore this email.</p>
     """
-    send_email(email, "ClaimSafer — Activate your account", html)
+    if background_tasks is not None:
+        background_tasks.add_task(_send_email_safe, email, "ClaimSafer — Activate your account", html)
+    else:
+        send_email(email, "ClaimSafer — Activate your account", html)
 
 # --- Activation routes ---
 @router.get("/auth/activate", response_class=HTMLResponse)
@@ -51,14 +76,11 @@ def activate_form(request: Request, token: str):
         email = verify_activation_token(token)
     except Exception:
         return HTMLResponse("<h3>Invalid or expired token.</h3>", status_code=400)
-    return f"""
-    <form method='post' action='/auth/activate'>
-        <input type='hidden' name='token' value='{token}' />
-        <label>Email: {email}</label><br>
-        <input type='password' name='password' placeholder='Set your password' minlength='8' required /><br>
-        <button type='submit'>Activate</button>
-    </form>
-    """
+    # Autoescaping here also closes the reflected-token XSS of the old f-string
+    return templates.TemplateResponse(request, "activate.html", {
+        "token": token,
+        "email": email,
+    })
 
 @router.post("/auth/activate")
 def activate_post(token: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
@@ -71,44 +93,47 @@ def activate_post(token: str = Form(...), password: str = Form(...), db: Session
         return HTMLResponse("<h3>User not found.</h3>", status_code=404)
     if len(password) < 8:
         return HTMLResponse("<h3>Password must be at least 8 characters.</h3>", status_code=400)
-    user.password_hash = generate_password_hash(password)
+    user.password_hash = hash_password(password)
     user.is_active = True
     db.commit()
+    invalidate_session_cache(user.email)
     return RedirectResponse("/login", status_code=302)
 
 # --- Login routes ---
 @router.get("/login", response_class=HTMLResponse)
 def login_form(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return templates.TemplateResponse(request, "login.html")
 
 @router.post("/login")
 def login_post(request: Request, response: Response, email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
     email = normalize_email(email)
     user = db.query(User).filter_by(email=email).first()
     if not user or not user.password_hash or not user.is_active:
-        return templates.TemplateResponse("login.html", {
-            "request": request,
+        return templates.TemplateResponse(request, "login.html", {
             "error": "Invalid credentials or inactive account."
         }, status_code=401)
-    if not check_password_hash(user.password_hash, password):
-        return templates.TemplateResponse("login.html", {
-            "request": request,
+    if not verify_password(password, user.password_hash):
+        return templates.TemplateResponse(request, "login.html", {
             "error": "Invalid credentials."
         }, status_code=401)
+    # Opportunistic migration: legacy PBKDF2 hashes get re-hashed to bcrypt
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = hash_password(password)
+        db.commit()
     # Set session cookie
     response = RedirectResponse("/dashboard", status_code=302)
     response.set_cookie(
         key="session",
-        value=serializer.dumps(email, salt="session"),
+        value=session_serializer.dumps(email, salt="session"),
         httponly=True,
         samesite="lax",
-        secure=APP_BASE_URL.startswith("https://"),
+        secure=SECURE_COOKIE,
     )
     return response
 
 # --- Magic link ---
 @router.post("/auth/magic-link")
-def magic_link(email: str = Form(...), db: Session = Depends(get_db)):
+def magic_link(background_tasks: BackgroundTasks, email: str = Form(...), db: Session = Depends(get_db)):
     email = normalize_email(email)
     user = db.query(User).filter_by(email=email).first()
     if not user or not user.is_active:
@@ -116,7 +141,7 @@ def magic_link(email: str = Form(...), db: Session = Depends(get_db)):
     token = sign_magic_token(email)
     link = f"{APP_BASE_URL}/auth/magic-login?token={token}"
     html = f"<p>Click to log in: <a href='{link}'>Magic Login</a></p>"
-    send_email(email, "ClaimSafer — Magic Login", html)
+    background_tasks.add_task(_send_email_safe, email, "ClaimSafer — Magic Login", html)
     return HTMLResponse("<h3>Magic link sent! Check your email.</h3>")
 
 @router.get("/auth/magic-login")
@@ -125,35 +150,126 @@ def magic_login(token: str, response: Response, db: Session = Depends(get_db)):
         email = verify_magic_token(token)
     except Exception:
         return HTMLResponse("<h3>Invalid or expired magic link.</h3>", status_code=400)
-    user = db.query(User).filter_by(email=normalize_email(email)).first()
+    # Magic tokens are minted from the canonical email
+    user = db.query(User).filter_by(email=email).first()
     if not user or not user.is_active:
         return HTMLResponse("<h3>User not found or not active.</h3>", status_code=404)
     # Set session cookie
     response = RedirectResponse("/dashboard", status_code=302)
     response.set_cookie(
         key="session",
-        value=serializer.dumps(email, salt="session"),
+        value=session_serializer.dumps(email, salt="session"),
         httponly=True,
         samesite="lax",
-        secure=APP_BASE_URL.startswith("https://"),
+        secure=SECURE_COOKIE,
     )
     return response
 
+# --- Session cookie cache ---
+# Verified session cookie -> user snapshot, so repeat requests skip the
+# HMAC verify and the users table round trip. When REDIS_URL is set the
+# snapshots live in Redis and are shared across workers; otherwise an
+# in-process TTL cache is used. Short TTLs keep stale tier data bounded;
+# explicit invalidation covers password/tier changes.
+SessionUser = namedtuple("SessionUser", ["id", "email", "tier", "is_active"])
+
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "60"))
+
+_session_cache = TTLCache(maxsize=10_000, ttl=SESSION_CACHE_TTL)
+_session_cache_lock = threading.RLock()
+
+_redis = None
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    try:
+        import redis
+        _redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    except Exception as e:
+        print(f"⚠️ WARNING: REDIS_URL set but Redis unavailable, using in-process cache: {e}")
+
+def _session_cache_key(session_cookie: str) -> str:
+    return hashlib.blake2b(session_cookie.encode(), digest_size=16).hexdigest()
+
+def _session_cache_get(session_cookie: str):
+    key = _session_cache_key(session_cookie)
+    if _redis is not None:
+        try:
+            raw = _redis.get(f"session:{key}")
+        except Exception:
+            raw = None
+        if raw:
+            data = json.loads(raw)
+            return SessionUser(data["id"], data["email"], Tier(data["tier"]), data["is_active"])
+        return None
+    with _session_cache_lock:
+        return _session_cache.get(key)
+
+def _session_cache_put(session_cookie: str, user):
+    key = _session_cache_key(session_cookie)
+    snapshot = SessionUser(user.id, user.email, user.tier, user.is_active)
+    if _redis is not None:
+        try:
+            pipe = _redis.pipeline()
+            pipe.set(f"session:{key}", json.dumps({
+                "id": snapshot.id,
+                "email": snapshot.email,
+                "tier": snapshot.tier.value,
+                "is_active": snapshot.is_active,
+            }), ex=SESSION_CACHE_TTL)
+            # Track keys per email so invalidation doesn't need a SCAN
+            pipe.sadd(f"session_keys:{snapshot.email}", key)
+            pipe.expire(f"session_keys:{snapshot.email}", SESSION_CACHE_TTL)
+            pipe.execute()
+        except Exception:
+            pass
+        return
+    with _session_cache_lock:
+        _session_cache[key] = snapshot
+
+def invalidate_session_cache(email: str = None):
+    """Drop cached session snapshots — all of them, or just one user's."""
+    if _redis is not None:
+        try:
+            if email is None:
+                return  # full flush not supported on shared Redis; TTL bounds staleness
+            email = normalize_email(email)
+            keys = _redis.smembers(f"session_keys:{email}")
+            if keys:
+                _redis.delete(*[f"session:{k}" for k in keys])
+            _redis.delete(f"session_keys:{email}")
+        except Exception:
+            pass
+        return
+    with _session_cache_lock:
+        if email is None:
+            _session_cache.clear()
+            return
+        email = normalize_email(email)
+        stale = [k for k, v in _session_cache.items() if v.email == email]
+        for key in stale:
+            _session_cache.pop(key, None)
+
 # --- Session-protected dashboard ---
 def get_current_user_from_session(request: Request, db: Session):
     session_cookie = request.cookies.get("session")
     if not session_cookie:
         raise HTTPException(status_code=401, detail="Not logged in")
+    snapshot = _session_cache_get(session_cookie)
+    if snapshot is not None:
+        return snapshot
     try:
-        email = serializer.loads(session_cookie, salt="session")
+        email = session_serializer.loads(session_cookie, salt="session")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid session")
-    user = db.query(User).filter_by(email=normalize_email(email)).first()
+    # Session cookies are signed from the canonical email, so no
+    # re-normalization is needed here.
+    user = db.query(User).filter_by(email=email).first()
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User not found or not active")
+    _session_cache_put(session_cookie, user)
     return user
 
 @router.get("/dashboard", response_class=HTMLResponse)
 def dashboard(request: Request, db: Session = Depends(get_db)):
     user = get_current_user_from_session(request, db)
-    return f"<h2>Welcome {user.email}, your tier is {user.tier.value}.</h2>"
+    return templates.TemplateResponse(request, "auth_dashboard.html", {"user": user})
@@ -4,15 +4,51 @@ from app.metrics import increment_email_sent
 
 logger = logging.getLogger("app.background")
 
+QUEUE_MAXSIZE = 1024
+NUM_WORKERS = 4
+
 class BackgroundQueue:
-    def __init__(self):
-        self.loop = asyncio.get_event_loop()
-        self.tasks = []
+    """Bounded async work queue drained by a fixed pool of worker coroutines.
+
+    The queue and workers are created lazily from the running event loop
+    (start() is called from app startup), so nothing binds to a loop at
+    import time. Completed jobs are not retained, so memory stays bounded.
+    """
+    def __init__(self, maxsize=QUEUE_MAXSIZE, num_workers=NUM_WORKERS):
+        self.maxsize = maxsize
+        self.num_workers = num_workers
+        self.queue = None
+        self.workers = []
+
+    async def start(self):
+        if self.queue is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self.workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.num_workers)
+        ]
+
+    async def stop(self):
+        if self.queue is None:
+            return
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+        self.queue = None
 
     def enqueue(self, func, *args, retry=3, backoff_sec=2, **kwargs):
-        task = self.loop.create_task(self._run_with_retry(func, *args, retry=retry, backoff_sec=backoff_sec, **kwargs))
-        self.tasks.append(task)
-        return task
+        if self.queue is None:
+            raise RuntimeError("BackgroundQueue not started — call start() from app startup")
+        self.queue.put_nowait((func, args, kwargs, retry, backoff_sec))
+
+    async def _worker(self):
+        while True:
+            func, args, kwargs, retry, backoff_sec = await self.queue.get()
+            try:
+                await self._run_with_retry(func, *args, retry=retry, backoff_sec=backoff_sec, **kwargs)
+            finally:
+                self.queue.task_done()
 
     async def _run_with_retry(self, func, *args, retry=3, backoff_sec=2, **kwargs):
         for attempt in range(retry):
@@ -28,7 +64,8 @@ queue = BackgroundQueue()
 
 async def send_email_bg(to, subject, html, text=None, template="generic"):
     from app.utils import send_email
-    send_email(to, subject, html, text)
+    # send_email is blocking SMTP — keep it off the event loop
+    await asyncio.to_thread(send_email, to, subject, html, text)
     increment_email_sent(template)
 
 async def post_payment_bg(user_id):
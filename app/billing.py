@@ -8,8 +8,12 @@ PRICE_TO_TIER = {
 }
 DEFAULT_TIER = Tier.starter
 
+# Reverse lookup, built once (last price wins if a tier ever has several)
+TIER_TO_PRICE = {tier: pid for pid, tier in PRICE_TO_TIER.items()}
+
 TIER_ORDER = [Tier.free, Tier.starter, Tier.pro, Tier.enterprise]
+TIER_RANK = {t: i for i, t in enumerate(TIER_ORDER)}
 
 def tier_rank(tier: Tier) -> int:
     """Return the rank of a tier for comparison (higher is better)."""
-    return TIER_ORDER.index(tier)
+    return TIER_RANK[tier]
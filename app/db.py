@@ -9,6 +9,20 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 engine_args = {}
 if DATABASE_URL.startswith("sqlite"):
     engine_args["connect_args"] = {"check_same_thread": False}
+else:
+    # Postgres: a bigger pool so concurrent requests don't serialize behind
+    # connection checkout, pre-ping to drop dead connections, and a recycle
+    # window below typical LB idle timeouts. A statement timeout keeps one
+    # slow query from pinning a connection.
+    engine_args.update(
+        pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "40")),
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+    if DATABASE_URL.startswith("postgresql"):
+        timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "3000"))
+        engine_args["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
 
 engine = create_engine(DATABASE_URL, **engine_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -2,7 +2,6 @@ from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app.models import User
-from app.utils import normalize_email
 from typing import Optional
 
 
@@ -10,13 +9,21 @@ def get_current_user(
     request: Request,
     db: Session = Depends(get_db)
 ) -> Optional[User]:
-    """Get current user from session or return None if not authenticated."""
+    """Get current user from the session or return None."""
     user_id = request.session.get("user_id")
-    if not user_id:
-        return None
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    return user
+    if user_id:
+        # Session.get hits the identity map and can skip SQL entirely
+        return db.get(User, user_id)
+    # Fall back to the signed session cookie set by the login routes
+    session_cookie = request.cookies.get("session")
+    if session_cookie:
+        from app.auth import session_serializer
+        try:
+            email = session_serializer.loads(session_cookie, salt="session")
+        except Exception:
+            return None
+        return db.query(User).filter(User.email == email).first()
+    return None
 
 
 def require_active_user(
@@ -58,9 +65,10 @@ def require_tier(min_tier: str):
         current_user: User = Depends(require_active_user)
     ) -> User:
         from app.billing import tier_rank
-        
+        from app.models import Tier
+
         user_rank = tier_rank(current_user.tier)
-        required_rank = tier_rank(min_tier)
+        required_rank = tier_rank(Tier(min_tier))
         
         if user_rank < required_rank:
             raise HTTPException(
@@ -52,9 +52,11 @@ def enforce_countries_limit(countries: list[str], entitlements: dict, user: User
         )
 
 def meter_daily_check(db: Session, user: User, entitlements: dict, amount: int = 1):
+    """Charge a check against today's counter; returns it so callers can
+    reuse the row instead of re-selecting it. None means unlimited."""
     max_checks = entitlements.get("daily_checks", 0)
     if max_checks == -1:
-        return  # unlimited
+        return None  # unlimited
     counter = get_or_create_today_counter(db, user.id)
     remaining = max_checks - counter.daily_checks_used
     if remaining < amount:
@@ -65,4 +67,4 @@ def meter_daily_check(db: Session, user: User, entitlements: dict, amount: int =
             limit=max_checks,
             remaining=max(0, remaining),
         )
-    increment_daily_checks(db, user.id, amount)
+    return increment_daily_checks(db, user.id, amount)
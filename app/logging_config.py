@@ -1,12 +1,19 @@
 import logging
-import json
 import re
 import sys
+import orjson
 from datetime import datetime
 
-SECRET_RE = re.compile(r"(authorization|api[_-]?key|password|token)[\"':= ]+([^,\\s]+)", re.I)
+SECRET_RE = re.compile(r"(authorization|api[_-]?key|password|token)[\"':= ]+([^,\\s]+)", re.I | re.ASCII)
+
+# Cheap substring prefilter: the formatter runs on every request log line,
+# and most lines contain nothing secret-like, so skip the regex entirely.
+_SECRET_HINTS = ("auth", "key", "password", "token")
 
 def redact_secrets(msg):
+    lowered = msg.lower()
+    if not any(hint in lowered for hint in _SECRET_HINTS):
+        return msg
     return SECRET_RE.sub(r"\1=***", msg)
 
 class JsonLogFormatter(logging.Formatter):
@@ -29,7 +36,7 @@ class JsonLogFormatter(logging.Formatter):
             log["latency_ms"] = record.latency_ms
         if hasattr(record, "user_email"):
             log["user_email"] = record.user_email
-        return json.dumps(log)
+        return orjson.dumps(log).decode()
 
 def setup_logging():
     handler = logging.StreamHandler(sys.stdout)
@@ -15,14 +15,22 @@ webhook_events_total = Counter(
 emails_sent_total = Counter(
     "emails_sent_total", "Emails sent", ["template"]
 )
+check_claims_cache_total = Counter(
+    "check_claims_cache_total", "check-claims response cache lookups", ["outcome"]
+)
 
 def instrument_route(path_template):
     def decorator(func):
+        # Bind label children once per (method, status) seen on this route so
+        # the hot path skips prometheus_client's labels() dict lookup.
+        counter_children = {}
+        duration_children = {}
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             request = kwargs.get("request")
             method = request.method if request else "UNKNOWN"
-            start = time.time()
+            start = time.perf_counter()
             try:
                 resp = await func(*args, **kwargs)
                 status = getattr(resp, "status_code", 200)
@@ -30,8 +38,19 @@ def instrument_route(path_template):
                 status = 500
                 raise
             finally:
-                http_requests_total.labels(method, path_template, status).inc()
-                http_request_duration_seconds.labels(method, path_template).observe(time.time() - start)
+                elapsed = time.perf_counter() - start
+                counter = counter_children.get((method, status))
+                if counter is None:
+                    counter = counter_children[(method, status)] = (
+                        http_requests_total.labels(method, path_template, status)
+                    )
+                histogram = duration_children.get(method)
+                if histogram is None:
+                    histogram = duration_children[method] = (
+                        http_request_duration_seconds.labels(method, path_template)
+                    )
+                counter.inc()
+                histogram.observe(elapsed)
             return resp
         return wrapper
     return decorator
@@ -42,5 +61,8 @@ def increment_webhook_event(event_type, outcome):
 def increment_email_sent(template):
     emails_sent_total.labels(template).inc()
 
+def increment_check_claims_cache(outcome):
+    check_claims_cache_total.labels(outcome).inc()
+
 def metrics_endpoint():
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
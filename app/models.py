@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SqlEnum, Text, func, Date, ForeignKey, UniqueConstraint, Index
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.orm import declarative_base, relationship, validates
 from enum import Enum as PyEnum
 
 Base = declarative_base()
@@ -18,17 +18,23 @@ class User(Base):
     is_active = Column(Boolean, default=False)
     tier = Column(SqlEnum(Tier), default=Tier.free, nullable=False)
     role = Column(String(50), nullable=True)  # Made optional to avoid migration issues
-    stripe_customer_id = Column(String, nullable=True)
+    stripe_customer_id = Column(String, nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     usage_counters = relationship("UsageCounter", back_populates="user")
 
+    @validates("email")
+    def _normalize_email(self, key, value):
+        # Canonical form on write, so read paths can compare raw values
+        return value.strip().lower() if value else value
+
 class WebhookEvent(Base):
     __tablename__ = "webhook_events"
     id = Column(Integer, primary_key=True)
-    stripe_event_id = Column(String, unique=True, nullable=False)
+    stripe_event_id = Column(String, unique=True, index=True, nullable=False)
     type = Column(String, nullable=False)
     payload = Column(Text, nullable=False)
+    payload_sha256 = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class UsageCounter(Base):
@@ -40,6 +46,10 @@ class UsageCounter(Base):
     user = relationship("User", back_populates="usage_counters")
     __table_args__ = (
         UniqueConstraint("user_id", "date", name="uq_user_date"),
+        # Date-first composite for admin usage scans over day windows
+        Index("ix_usage_date_user", "date", "user_id"),
+        # Serves the per-day top-N ordering in get_usage_for_date
+        Index("ix_usage_date_checks", "date", "daily_checks_used"),
     )
 
 class MembershipAudit(Base):
@@ -52,3 +62,7 @@ class MembershipAudit(Base):
     stripe_customer_id = Column(String, nullable=True)
     reason = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (
+        # Audit history is read per email ordered by time
+        Index("ix_audit_email_created", "email", "created_at"),
+    )
@@ -1,3 +1,4 @@
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from app.models import User, Tier, MembershipAudit
 from app.utils import normalize_email
@@ -6,7 +7,7 @@ from typing import Optional
 
 def get_user_by_email(db: Session, email: str):
     email = normalize_email(email)
-    return db.query(User).filter(User.email == email).first()
+    return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
 
 def create_user(db: Session, email: str, tier: Tier, stripe_customer_id=None, is_active=False):
     email = normalize_email(email)
@@ -31,22 +32,31 @@ def update_user_tier_and_customer(db: Session, user: User, new_tier: Tier, strip
     return user
 
 def record_membership_audit(db: Session, *, email, stripe_event_id, old_tier, new_tier, stripe_customer_id, reason):
-    audit = MembershipAudit(
-        email=normalize_email(email),
-        stripe_event_id=stripe_event_id,
-        old_tier=old_tier,
-        new_tier=new_tier,
-        stripe_customer_id=stripe_customer_id,
-        reason=reason
+    # Fire-and-forget append: a Core INSERT skips the identity-map
+    # bookkeeping and the post-commit refresh SELECT, since no caller reads
+    # the row back
+    db.execute(
+        insert(MembershipAudit).values(
+            email=normalize_email(email),
+            stripe_event_id=stripe_event_id,
+            old_tier=old_tier,
+            new_tier=new_tier,
+            stripe_customer_id=stripe_customer_id,
+            reason=reason,
+        )
     )
-    db.add(audit)
     db.commit()
-    db.refresh(audit)
-    return audit
+
+def record_membership_audits_bulk(db: Session, rows: list):
+    """Insert many audit rows in one executemany statement."""
+    if not rows:
+        return
+    db.execute(insert(MembershipAudit), rows)
+    db.commit()
 
 def upsert_user_by_email(db: Session, email: str, tier: Tier, stripe_customer_id=None):
     email = normalize_email(email)
-    user = db.query(User).filter(User.email == email).first()
+    user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
     if user:
         user.tier = tier
         if stripe_customer_id and not user.stripe_customer_id:
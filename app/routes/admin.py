@@ -7,17 +7,16 @@ import json
 from app.db import get_db
 from app.models import User, Tier, UsageCounter, MembershipAudit
 from app.services.users import get_user_by_email
-from app.services.usage import get_user_usage_days
+from app.services.usage import get_usage_for_date, get_user_usage_days
 from app.dependencies import require_role
 from app.security import hash_password
 from app.repository import create_user
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from app.templating import templates
 
 router = APIRouter(prefix="/admin", tags=["admin"])
-templates = Jinja2Templates(directory="templates")
 
-@router.get("/admin/usage", response_class=HTMLResponse)
+@router.get("/usage", response_class=HTMLResponse)
 def admin_usage(
     request: Request,
     date: str = Query(None),
@@ -27,13 +26,12 @@ def admin_usage(
     if not date:
         date = datetime.utcnow().date().isoformat()
     rows = get_usage_for_date(db, date)
-    return templates.TemplateResponse("admin_usage.html", {
-        "request": request,
+    return templates.TemplateResponse(request, "admin_usage.html", {
         "rows": rows,
         "date": date
     })
 
-@router.get("/admin/users/{email}/usage")
+@router.get("/users/{email}/usage")
 def user_usage_history(
     email: str,
     days: int = Query(30, ge=1, le=90),
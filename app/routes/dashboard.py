@@ -1,24 +1,24 @@
 from fastapi import APIRouter, Request, Depends, Form, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from app.dependencies import get_current_user, require_active_user
 from app.services.entitlements import get_entitlements
 from app.services.usage import remaining_daily_checks, get_or_create_today_counter
 from app.utils import normalize_email, send_email
-from app.security import generate_csrf_token, validate_csrf, password_strong_enough
+from app.security import generate_csrf_token, validate_csrf, password_strong_enough, hash_password, verify_password
 from app.db import get_db
+from app.templating import templates
 from starlette.responses import Response
+from cachetools import TTLCache
 import os
+import threading
 import stripe
-from werkzeug.security import check_password_hash, generate_password_hash
 from dotenv import load_dotenv
 from datetime import timedelta
 
 load_dotenv()
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:8000")
 UPGRADE_URL = os.getenv("UPGRADE_URL", "https://claimsafer.com/pricing")
@@ -30,8 +30,7 @@ stripe.api_key = STRIPE_API_KEY
 @router.get("/test-template", response_class=HTMLResponse)
 def test_template(request: Request):
     try:
-        return templates.TemplateResponse("base.html", {
-            "request": request,
+        return templates.TemplateResponse(request, "base.html", {
             "content": "<h1>Template Test</h1><p>If you see this styled, templates work!</p>"
         })
     except Exception as e:
@@ -43,10 +42,11 @@ def dashboard(request: Request, db: Session = Depends(get_db), user=Depends(requ
     try:
         ents = get_entitlements(user.tier)
         counter = get_or_create_today_counter(db, user.id)
-        remaining = remaining_daily_checks(db, user, ents)
-        csrf_token = generate_csrf_token()
-        response = templates.TemplateResponse("dashboard.html", {
-            "request": request,
+        remaining = remaining_daily_checks(db, user, ents, counter=counter)
+        # One token per session: reuse the cookie instead of burning
+        # urandom + base64 on every page view
+        csrf_token = request.cookies.get("csrf_token") or generate_csrf_token()
+        response = templates.TemplateResponse(request, "dashboard.html", {
             "user": user,
             "ents": ents,
             "used": counter.daily_checks_used,
@@ -54,7 +54,8 @@ def dashboard(request: Request, db: Session = Depends(get_db), user=Depends(requ
             "csrf_token": csrf_token,
             "upgrade_url": UPGRADE_URL,
         })
-        response.set_cookie("csrf_token", csrf_token, httponly=False, samesite="lax")
+        if "csrf_token" not in request.cookies:
+            response.set_cookie("csrf_token", csrf_token, httponly=False, samesite="lax")
         return response
     except Exception as e:
         print(f"Error in dashboard route: {e}")
@@ -66,34 +67,36 @@ def account(request: Request, db: Session = Depends(get_db), user=Depends(requir
     try:
         ents = get_entitlements(user.tier)
         counter = get_or_create_today_counter(db, user.id)
-        csrf_token = generate_csrf_token()
-        response = templates.TemplateResponse("account.html", {
-            "request": request,
+        csrf_token = request.cookies.get("csrf_token") or generate_csrf_token()
+        response = templates.TemplateResponse(request, "account.html", {
             "user": user,
             "ents": ents,
             "used": counter.daily_checks_used,
             "csrf_token": csrf_token,
         })
-        response.set_cookie("csrf_token", csrf_token, httponly=False, samesite="lax")
+        if "csrf_token" not in request.cookies:
+            response.set_cookie("csrf_token", csrf_token, httponly=False, samesite="lax")
         return response
     except Exception as e:
         print(f"Error in account route: {e}")
         return HTMLResponse(f"<h1>Account Page</h1><p>Error: {e}</p>")
 
 @router.post("/account/change-password")
-def change_password(request: Request, db: Session = Depends(get_db), user=Depends(require_active_user), current_password: str = Form(...), new_password: str = Form(...)):
-    validate_csrf(request)
-    if not check_password_hash(user.password_hash, current_password):
+def change_password(request: Request, db: Session = Depends(get_db), user=Depends(require_active_user), current_password: str = Form(...), new_password: str = Form(...), csrf_token: str = Form(None)):
+    validate_csrf(request, csrf_token)
+    if not verify_password(current_password, user.password_hash):
         return RedirectResponse("/account?error=badpass", status_code=303)
     if not password_strong_enough(new_password):
         return RedirectResponse("/account?error=weakpass", status_code=303)
-    user.password_hash = generate_password_hash(new_password)
+    user.password_hash = hash_password(new_password)
     db.commit()
+    from app.auth import invalidate_session_cache
+    invalidate_session_cache(user.email)
     return RedirectResponse("/account?success=1", status_code=303)
 
 @router.post("/account/request-email-change")
-def request_email_change(request: Request, db: Session = Depends(get_db), user=Depends(require_active_user), new_email: str = Form(...)):
-    validate_csrf(request)
+def request_email_change(request: Request, db: Session = Depends(get_db), user=Depends(require_active_user), new_email: str = Form(...), csrf_token: str = Form(None)):
+    validate_csrf(request, csrf_token)
     # Use existing email change logic (Step 6)
     from app.auth import sign_activation_token
     email = normalize_email(new_email)
@@ -105,8 +108,8 @@ def request_email_change(request: Request, db: Session = Depends(get_db), user=D
     return RedirectResponse("/account?success=1", status_code=303)
 
 @router.post("/account/magic-link")
-def send_magic_link(request: Request, user=Depends(require_active_user)):
-    validate_csrf(request)
+def send_magic_link(request: Request, user=Depends(require_active_user), csrf_token: str = Form(None)):
+    validate_csrf(request, csrf_token)
     from app.auth import sign_magic_token
     token = sign_magic_token(user.email)
     link = f"{APP_BASE_URL}/auth/magic-login?token={token}"
@@ -120,9 +123,8 @@ def billing(request: Request, db: Session = Depends(get_db), user=Depends(requir
     try:
         ents = get_entitlements(user.tier)
         counter = get_or_create_today_counter(db, user.id)
-        csrf_token = generate_csrf_token()
-        response = templates.TemplateResponse("billing.html", {
-            "request": request,
+        csrf_token = request.cookies.get("csrf_token") or generate_csrf_token()
+        response = templates.TemplateResponse(request, "billing.html", {
             "user": user,
             "ents": ents,
             "used": counter.daily_checks_used,
@@ -130,20 +132,32 @@ def billing(request: Request, db: Session = Depends(get_db), user=Depends(requir
             "upgrade_url": UPGRADE_URL,
             "timedelta": timedelta,
         })
-        response.set_cookie("csrf_token", csrf_token, httponly=False, samesite="lax")
+        if "csrf_token" not in request.cookies:
+            response.set_cookie("csrf_token", csrf_token, httponly=False, samesite="lax")
         return response
     except Exception as e:
         print(f"Error in billing route: {e}")
         return HTMLResponse(f"<h1>Billing Page</h1><p>Error: {e}</p>")
 
+# Portal URLs stay valid for a while, so repeated clicks within a few
+# minutes reuse the last one instead of paying another Stripe round trip
+_portal_url_cache = TTLCache(maxsize=1_000, ttl=300)
+_portal_url_lock = threading.RLock()
+
 @router.post("/billing/portal")
-def billing_portal(request: Request, user=Depends(require_active_user)):
-    validate_csrf(request)
+def billing_portal(request: Request, user=Depends(require_active_user), csrf_token: str = Form(None)):
+    validate_csrf(request, csrf_token)
     if not user.stripe_customer_id:
         return RedirectResponse("/billing?error=nocustomer", status_code=303)
-    return_url = f"{APP_BASE_URL}{STRIPE_PORTAL_RETURN_PATH}"
-    session = stripe.billing_portal.Session.create(
-        customer=user.stripe_customer_id,
-        return_url=return_url
-    )
-    return RedirectResponse(session.url, status_code=303)
+    with _portal_url_lock:
+        url = _portal_url_cache.get(user.stripe_customer_id)
+    if url is None:
+        return_url = f"{APP_BASE_URL}{STRIPE_PORTAL_RETURN_PATH}"
+        session = stripe.billing_portal.Session.create(
+            customer=user.stripe_customer_id,
+            return_url=return_url
+        )
+        url = session.url
+        with _portal_url_lock:
+            _portal_url_cache[user.stripe_customer_id] = url
+    return RedirectResponse(url, status_code=303)
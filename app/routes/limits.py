@@ -17,9 +17,10 @@ def claims_check(
     ents = load_entitlements(user)
     countries = data.get("countries", [])
     enforce_countries_limit(countries, ents, user)
-    meter_daily_check(db, user, ents, amount=1)
-    counter = get_or_create_today_counter(db, user.id)
-    remaining = remaining_daily_checks(db, user, ents)
+    counter = meter_daily_check(db, user, ents, amount=1)
+    if counter is None:  # unlimited tier never meters
+        counter = get_or_create_today_counter(db, user.id)
+    remaining = remaining_daily_checks(db, user, ents, counter=counter)
     return {
         "ok": True,
         "tier": user.tier.value,
@@ -15,7 +15,7 @@ def get_my_usage(x_debug_email: str = Header(None), db: Session = Depends(get_db
     user = get_or_error(db, x_debug_email)
     entitlements = get_entitlements(user.tier)
     counter = get_or_create_today_counter(db, user.id)
-    remaining = remaining_daily_checks(db, user, entitlements)
+    remaining = remaining_daily_checks(db, user, entitlements, counter=counter)
     return {
         "date": datetime.utcnow().date().isoformat(),
         "used": counter.daily_checks_used,
@@ -28,11 +28,12 @@ def increment_my_usage(x_debug_email: str = Header(None), db: Session = Depends(
         raise HTTPException(status_code=401, detail="Missing X-Debug-Email header")
     user = get_or_error(db, x_debug_email)
     entitlements = get_entitlements(user.tier)
-    remaining = remaining_daily_checks(db, user, entitlements)
+    counter = get_or_create_today_counter(db, user.id)
+    remaining = remaining_daily_checks(db, user, entitlements, counter=counter)
     if remaining <= 0:
         raise HTTPException(status_code=402, detail="Upgrade required")
     counter = increment_daily_checks(db, user.id, 1)
-    remaining = remaining_daily_checks(db, user, entitlements)
+    remaining = remaining_daily_checks(db, user, entitlements, counter=counter)
     return {
         "date": datetime.utcnow().date().isoformat(),
         "used": counter.daily_checks_used,
@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.db import get_db
+from app.models import User, UsageCounter
 from app.services.users import get_or_error
 from app.services.entitlements import get_entitlements
+from datetime import datetime
+import hmac
 import os
 
 router = APIRouter()
 
 ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "replace-me")
 
+def _admin_key_valid(candidate: str) -> bool:
+    """Constant-time admin key check — avoids the timing side channel of ==."""
+    if not candidate:
+        return False
+    return hmac.compare_digest(candidate.encode(), ADMIN_API_KEY.encode())
+
 @router.get("/me/plan")
 def get_my_plan(x_debug_email: str = Header(None), db: Session = Depends(get_db)):
     if not x_debug_email:
@@ -18,19 +28,37 @@ def get_my_plan(x_debug_email: str = Header(None), db: Session = Depends(get_db)
     return {"email": user.email, "tier": user.tier.value, "entitlements": entitlements}
 
 @router.get("/admin/users")
-def admin_list_users(admin_api_key: str = Header(None), db: Session = Depends(get_db)):
-    if admin_api_key != ADMIN_API_KEY:
+def admin_list_users(
+    admin_api_key: str = Header(None),
+    limit: int = Query(100, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    if not _admin_key_valid(admin_api_key):
         raise HTTPException(status_code=403, detail="Forbidden")
-    users = db.query(get_or_error.__globals__["User"]).all()
-    return [{"email": u.email, "tier": u.tier.value, "is_active": u.is_active, "created_at": u.created_at} for u in users]
+    # Column tuples, not mapped instances: no identity-map bookkeeping and
+    # no password_hash pulled over the wire; paginated so the payload stays
+    # bounded as the user table grows
+    rows = db.execute(
+        select(User.email, User.tier, User.is_active, User.created_at)
+        .order_by(User.id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    return [
+        {"email": email, "tier": tier.value, "is_active": is_active, "created_at": created_at}
+        for email, tier, is_active, created_at in rows
+    ]
 
 @router.get("/admin/users/{email}")
 def admin_user_detail(email: str, admin_api_key: str = Header(None), db: Session = Depends(get_db)):
-    if admin_api_key != ADMIN_API_KEY:
+    if not _admin_key_valid(admin_api_key):
         raise HTTPException(status_code=403, detail="Forbidden")
     user = get_or_error(db, email)
-    today = __import__('datetime').datetime.utcnow().date()
-    usage = db.query(get_or_error.__globals__["UsageCounter"]).filter_by(user_id=user.id, date=today).first()
+    today = datetime.utcnow().date()
+    usage = db.execute(
+        select(UsageCounter).where(UsageCounter.user_id == user.id, UsageCounter.date == today)
+    ).scalar_one_or_none()
     return {
         "email": user.email,
         "tier": user.tier.value,
@@ -2,8 +2,10 @@ import os
 import secrets
 from datetime import datetime, timedelta
 from typing import Optional
+import bcrypt
+from fastapi import HTTPException
 from jose import JWTError, jwt
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 import re
 
 
@@ -49,20 +51,15 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
+# Lookaheads fold the three class checks into one pass of a pattern
+# compiled once at import
+_PASSWORD_RE = re.compile(r"^(?=.*[A-Z])(?=.*[a-z])(?=.*\d).{8,}$", re.DOTALL)
+
+
 def password_strong_enough(password: str) -> bool:
-    """Check if password meets security requirements."""
-    if len(password) < 8:
-        return False
-    
-    # Check for at least one uppercase, one lowercase, one digit
-    if not re.search(r"[A-Z]", password):
-        return False
-    if not re.search(r"[a-z]", password):
-        return False
-    if not re.search(r"\d", password):
-        return False
-    
-    return True
+    """Check if password meets security requirements:
+    at least 8 chars with one uppercase, one lowercase and one digit."""
+    return _PASSWORD_RE.match(password) is not None
 
 
 def generate_csrf_token() -> str:
@@ -70,16 +67,38 @@ def generate_csrf_token() -> str:
     return secrets.token_urlsafe(32)
 
 
-def validate_csrf(token: str, expected_token: str) -> bool:
-    """Validate a CSRF token."""
-    return secrets.compare_digest(token, expected_token)
+def validate_csrf(request, token: Optional[str]) -> None:
+    """Double-submit CSRF check: the submitted token must match the
+    csrf_token cookie. Raises 403 before the handler touches the database."""
+    expected = request.cookies.get("csrf_token", "")
+    if not (token and expected and secrets.compare_digest(token.encode(), expected.encode())):
+        raise HTTPException(status_code=403, detail="Invalid CSRF token")
+
+
+# bcrypt cost is ops-tunable: lower it on fast CPUs to cut verify latency
+# without losing brute-force resistance.
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", "12"))
 
 
 def hash_password(password: str) -> str:
-    """Hash a password using werkzeug."""
-    return generate_password_hash(password)
+    """Hash a password using bcrypt with the configured cost."""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_COST)).decode()
 
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against its hash."""
+    """Verify a password against its hash.
+
+    Accepts bcrypt hashes and falls back to werkzeug's legacy PBKDF2 format
+    for accounts created before the switch (re-hashed on next login).
+    """
+    if hashed.startswith("$2"):
+        try:
+            return bcrypt.checkpw(password.encode(), hashed.encode())
+        except ValueError:
+            return False
     return check_password_hash(hashed, password)
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True if the stored hash is not bcrypt (legacy PBKDF2)."""
+    return not hashed.startswith("$2")
@@ -3,23 +3,30 @@ import yaml
 from app.models import Tier
 from math import inf
 
-_entitlements = None
+try:
+    # libyaml's C loader parses ~10x faster; fall back if PyYAML was built
+    # without it
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 ENTITLEMENTS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../entitlements.yaml"))
 
 with open(ENTITLEMENTS_PATH, "r") as f:
-    _entitlements = yaml.safe_load(f)
+    _entitlements = yaml.load(f, Loader=_YamlLoader)
     if not _entitlements:
         raise RuntimeError("Entitlements YAML is empty or malformed!")
 
+# The YAML never changes after import, so both lookups flatten to plain
+# dicts keyed by the 4-valued Tier enum — no per-request .get chains
+_BY_TIER = {tier: _entitlements.get(tier.value, {}) for tier in Tier}
+_MAX_DAILY = {
+    tier: (inf if ent.get("daily_checks", 0) == -1 else ent.get("daily_checks", 0))
+    for tier, ent in _BY_TIER.items()
+}
+
 def get_entitlements(tier: Tier) -> dict:
-    if _entitlements is None:
-        raise RuntimeError("Entitlements not loaded!")
-    return _entitlements.get(tier.value, {})
+    return _BY_TIER[tier]
 
 def max_daily_checks(tier: Tier) -> int:
-    ent = get_entitlements(tier)
-    val = ent.get("daily_checks", 0)
-    if val == -1:
-        return inf
-    return val
+    return _MAX_DAILY[tier]
@@ -4,15 +4,19 @@ from app.models import Tier, User
 from app.repository import (
     get_user_by_email, create_user, update_user_tier_and_customer, record_membership_audit
 )
-from app.billing import PRICE_TO_TIER, DEFAULT_TIER, tier_rank
+from app.billing import PRICE_TO_TIER, DEFAULT_TIER, TIER_RANK, tier_rank
 from app.utils import normalize_email
 
 def decide_tier_from_prices(price_ids: Iterable[str]) -> Tier:
     """Return highest Tier found in price_ids; if none match, return DEFAULT_TIER."""
-    found = [PRICE_TO_TIER[pid] for pid in price_ids if pid in PRICE_TO_TIER]
-    if not found:
-        return DEFAULT_TIER
-    return max(found, key=tier_rank)
+    # Single pass, no intermediate list and no key= callback per element
+    best = None
+    best_rank = -1
+    for pid in price_ids:
+        tier = PRICE_TO_TIER.get(pid)
+        if tier is not None and TIER_RANK[tier] > best_rank:
+            best, best_rank = tier, TIER_RANK[tier]
+    return best if best is not None else DEFAULT_TIER
 
 def upsert_membership_from_checkout(
     db: Session,
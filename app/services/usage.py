@@ -1,69 +1,112 @@
 from datetime import datetime, date, timedelta
+from sqlalchemy import String, cast, select, update
 from sqlalchemy.orm import Session
 from app.models import UsageCounter, User
 from sqlalchemy.exc import IntegrityError
 
+def _today_counter_stmt(user_id: int, today: date):
+    return select(UsageCounter).where(
+        UsageCounter.user_id == user_id, UsageCounter.date == today
+    )
+
 def get_or_create_today_counter(db: Session, user_id: int) -> UsageCounter:
     today = datetime.utcnow().date()
-    counter = db.query(UsageCounter).filter_by(user_id=user_id, date=today).first()
-    if not counter:
-        counter = UsageCounter(user_id=user_id, date=today, daily_checks_used=0)
-        db.add(counter)
+    counter = db.execute(_today_counter_stmt(user_id, today)).scalar_one_or_none()
+    if counter is None:
+        # ON CONFLICT DO NOTHING closes the check-then-insert race against
+        # concurrent requests without an IntegrityError rollback round trip
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.execute(
+            dialect_insert(UsageCounter)
+            .values(user_id=user_id, date=today, daily_checks_used=0)
+            .on_conflict_do_nothing(index_elements=["user_id", "date"])
+        )
         db.commit()
-        db.refresh(counter)
+        counter = db.execute(_today_counter_stmt(user_id, today)).scalar_one()
     return counter
 
 def increment_daily_checks(db: Session, user_id: int, amount: int = 1) -> UsageCounter:
-    counter = get_or_create_today_counter(db, user_id)
-    counter.daily_checks_used += amount
+    today = datetime.utcnow().date()
+    # Single atomic UPDATE: the database does the addition, so concurrent
+    # requests can't lose increments to a read-modify-write race
+    increment = (
+        update(UsageCounter)
+        .where(UsageCounter.user_id == user_id, UsageCounter.date == today)
+        .values(daily_checks_used=UsageCounter.daily_checks_used + amount)
+    )
+    if db.execute(increment).rowcount == 0:
+        # First check of the day — create the row, then charge it
+        get_or_create_today_counter(db, user_id)
+        db.execute(increment)
     db.commit()
-    db.refresh(counter)
-    return counter
+    return db.execute(_today_counter_stmt(user_id, today)).scalar_one()
 
-def remaining_daily_checks(db: Session, user, entitlements: dict) -> int:
+def remaining_daily_checks(db: Session, user, entitlements: dict, counter: UsageCounter = None) -> int:
     from math import inf
     max_checks = entitlements.get("daily_checks", 0)
     if max_checks == -1:
         return inf
-    counter = get_or_create_today_counter(db, user.id)
+    # Callers that already hold today's counter pass it in to avoid a
+    # second identical SELECT on the same request
+    if counter is None:
+        counter = get_or_create_today_counter(db, user.id)
     return max_checks - counter.daily_checks_used
 
 def get_usage_for_date(db: Session, date: str, limit=50):
-    q = (
-        db.query(User.email, User.tier, UsageCounter.daily_checks_used, UsageCounter.date, User.updated_at)
+    # Tier comes back as its database string via CAST, skipping per-row
+    # Enum coercion; the (date, daily_checks_used) index serves the
+    # order-by-top-N directly
+    rows = db.execute(
+        select(
+            User.email,
+            cast(User.tier, String),
+            UsageCounter.daily_checks_used,
+            UsageCounter.date,
+            User.updated_at,
+        )
         .join(UsageCounter, User.id == UsageCounter.user_id)
-        .filter(UsageCounter.date == date)
+        .where(UsageCounter.date == date)
         .order_by(UsageCounter.daily_checks_used.desc())
         .limit(limit)
-    )
+    ).all()
     return [
         {
-            "email": row[0],
-            "tier": row[1].value if hasattr(row[1], "value") else row[1],
-            "daily_checks_used": row[2],
-            "date": row[3].isoformat(),
-            "updated_at": row[4].isoformat() if row[4] else None,
+            "email": email,
+            "tier": tier,
+            "daily_checks_used": used,
+            "date": day.isoformat(),
+            "updated_at": updated_at.isoformat() if updated_at else None,
         }
-        for row in q.all()
+        for email, tier, used, day, updated_at in rows
     ]
 
 def get_user_usage_days(db: Session, user_id: int, days: int):
+    # One range SELECT over the (user_id, date) unique index, fetching bare
+    # (date, used) tuples — no ORM hydration for a read-only report
     today = datetime.utcnow().date()
-    usage_map = {
-        uc.date: uc.daily_checks_used
-        for uc in db.query(UsageCounter).filter(
-            UsageCounter.user_id == user_id,
-            UsageCounter.date >= today - timedelta(days=days-1)
-        )
-    }
+    dates = [today - timedelta(days=i) for i in range(days)]
+    if not dates:
+        return []
+    usage_map = dict(
+        db.execute(
+            select(UsageCounter.date, UsageCounter.daily_checks_used).where(
+                UsageCounter.user_id == user_id,
+                UsageCounter.date >= dates[-1],
+            )
+        ).all()
+    )
     return [
-        {
-            "date": (today - timedelta(days=i)).isoformat(),
-            "daily_checks_used": usage_map.get(today - timedelta(days=i), 0)
-        }
-        for i in range(days)
+        {"date": d.isoformat(), "daily_checks_used": usage_map.get(d, 0)}
+        for d in dates
     ]
 
 def reset_counters_for_date(db: Session, reset_date: date):
-    db.query(UsageCounter).filter(UsageCounter.date == reset_date).update({UsageCounter.daily_checks_used: 0})
+    # Bulk UPDATE over potentially thousands of rows; nothing in the session
+    # depends on them, so skip the per-row 'evaluate' synchronization
+    db.query(UsageCounter).filter(UsageCounter.date == reset_date).update(
+        {UsageCounter.daily_checks_used: 0}, synchronize_session=False
+    )
     db.commit()
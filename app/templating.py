@@ -0,0 +1,18 @@
+"""Shared Jinja2 environment for all routers.
+
+One Jinja2Templates instance means a single compiled-template cache for the
+whole process, and the filesystem bytecode cache lets freshly started workers
+load compiled templates instead of recompiling them.
+"""
+import tempfile
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+_bytecode_dir = Path(tempfile.gettempdir()) / "claimsafer_jinja_cache"
+_bytecode_dir.mkdir(exist_ok=True)
+
+templates = Jinja2Templates(directory="app/templates")
+templates.env.auto_reload = False
+templates.env.bytecode_cache = FileSystemBytecodeCache(str(_bytecode_dir))
@@ -1,4 +1,7 @@
 import os
+import hashlib
+import threading
+from functools import lru_cache
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 import smtplib
 from email.mime.text import MIMEText
@@ -11,8 +14,27 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASS = os.getenv("SMTP_PASS", "")
 
+def user_scoped_cache_key(func, namespace: str = "", *, request=None, response=None, args=(), kwargs=None):
+    """fastapi-cache key builder that scopes entries per authenticated user.
+
+    Hashes the session cookie (and query string) into the key so one user's
+    cached response can never be served to another.
+    """
+    session_cookie = request.cookies.get("session", "") if request is not None else ""
+    query = str(request.url.query) if request is not None else ""
+    digest = hashlib.blake2b(
+        f"{func.__module__}.{func.__name__}:{session_cookie}:{query}".encode(),
+        digest_size=16,
+    ).hexdigest()
+    return f"{namespace}:{digest}"
+
+@lru_cache(maxsize=10_000)
 def normalize_email(email: str) -> str:
-    """Normalize email by stripping spaces and lowercasing."""
+    """Normalize email by stripping spaces and lowercasing.
+
+    Cached because the webhook path re-normalizes the same handful of
+    addresses on every event in a burst.
+    """
     return email.strip().lower()
 
 def sign_onboarding_token(email: str) -> str:
@@ -26,6 +48,30 @@ def verify_onboarding_token(token: str, max_age_seconds: int = 604800) -> str:
     except (BadSignature, SignatureExpired) as e:
         raise
 
+# One persistent SMTP connection per sender thread: the TCP + STARTTLS +
+# LOGIN handshake dominates send latency, so it is paid once per thread
+# instead of once per email
+_smtp_local = threading.local()
+
+def _smtp_connection() -> smtplib.SMTP:
+    server = getattr(_smtp_local, "server", None)
+    if server is not None:
+        try:
+            server.noop()
+            return server
+        except Exception:
+            _smtp_local.server = None
+            try:
+                server.close()
+            except Exception:
+                pass
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+    server.starttls()
+    if SMTP_USER:
+        server.login(SMTP_USER, SMTP_PASS)
+    _smtp_local.server = server
+    return server
+
 def send_email(to_email: str, subject: str, html: str, text: str = None):
     msg = MIMEMultipart("alternative")
     msg["Subject"] = subject
@@ -35,8 +81,10 @@ def send_email(to_email: str, subject: str, html: str, text: str = None):
     part2 = MIMEText(html, "html")
     msg.attach(part1)
     msg.attach(part2)
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        if SMTP_USER:
-            server.login(SMTP_USER, SMTP_PASS)
-        server.sendmail(EMAIL_FROM, to_email, msg.as_string())
+    try:
+        _smtp_connection().sendmail(EMAIL_FROM, to_email, msg.as_string())
+    except smtplib.SMTPException:
+        # Connection went stale between the noop and the send — rebuild it
+        # once and retry
+        _smtp_local.server = None
+        _smtp_connection().sendmail(EMAIL_FROM, to_email, msg.as_string())
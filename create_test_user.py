@@ -22,36 +22,39 @@ def create_test_user():
     db = SessionLocal()
     
     try:
-        # Check if user already exists
-        existing_user = db.query(User).filter_by(email="robertvgorp@gmail.com").first()
-        
-        if existing_user:
+        # One atomic INSERT ... ON CONFLICT DO NOTHING instead of a
+        # SELECT-then-INSERT pair — single round-trip, no race window
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        result = db.execute(
+            dialect_insert(User)
+            .values(
+                email="robertvgorp@gmail.com",
+                password_hash=generate_password_hash("test123456"),
+                tier=Tier.pro,  # Give pro tier for testing
+                is_active=True,
+                role="user",
+            )
+            .on_conflict_do_nothing(index_elements=["email"])
+        )
+        db.commit()
+
+        if result.rowcount:
+            print("✅ Test user created successfully!")
+            print(f"Email: robertvgorp@gmail.com")
+            print(f"Password: test123456")
+            print(f"Tier: {Tier.pro}")
+            print(f"Active: True")
+        else:
+            existing_user = db.query(User).filter_by(email="robertvgorp@gmail.com").first()
             print("✅ User already exists!")
             print(f"Email: {existing_user.email}")
             print(f"Tier: {existing_user.tier}")
             print(f"Active: {existing_user.is_active}")
-            return
-        
-        # Create new user
-        test_user = User(
-            email="robertvgorp@gmail.com",
-            password_hash=generate_password_hash("test123456"),
-            tier=Tier.pro,  # Give pro tier for testing
-            is_active=True,
-            role="user"
-        )
-        
-        # Add to database
-        db.add(test_user)
-        db.commit()
-        db.refresh(test_user)
-        
-        print("✅ Test user created successfully!")
-        print(f"Email: {test_user.email}")
-        print(f"Password: test123456")
-        print(f"Tier: {test_user.tier}")
-        print(f"Active: {test_user.is_active}")
-        
+
     except Exception as e:
         print(f"❌ Error creating user: {e}")
         db.rollback()
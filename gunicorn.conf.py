@@ -0,0 +1,18 @@
+import multiprocessing
+import os
+
+# Production entrypoint: gunicorn -c gunicorn.conf.py app.main:app
+# preload_app imports the app (and parses the claims CSV, normalized
+# columns, automatons, and TF-IDF matrix) once in the master before
+# forking, so Linux copy-on-write keeps those read-only pages shared
+# across workers instead of duplicating them N times.
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def on_starting(server):
+    from app.main import load_data
+    load_data()
@@ -7,36 +7,71 @@ This script will be run on Railway to update the database schema.
 import os
 import sys
 from sqlalchemy import create_engine, text
-from sqlalchemy.exc import ProgrammingError
+
+_COLUMN_EXISTS = text(
+    "SELECT 1 FROM information_schema.columns "
+    "WHERE table_name = :table AND column_name = :column"
+)
 
 def migrate_database():
-    """Add role column to users table if it doesn't exist."""
-    
+    """Apply schema changes the app expects (columns and indexes)."""
+
     # Get database URL from environment
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         print("❌ DATABASE_URL environment variable not set")
         return False
-    
+
     try:
         # Create engine
         engine = create_engine(database_url)
-        
-        with engine.connect() as conn:
-            # Check if role column exists
-            try:
-                result = conn.execute(text("SELECT role FROM users LIMIT 1"))
+
+        with engine.begin() as conn:
+            # Probe the catalog instead of querying the table and catching
+            # ProgrammingError — an index lookup, and no aborted transaction
+            # to roll back when the column is missing. IF NOT EXISTS makes
+            # the ALTER itself idempotent server-side.
+            if conn.execute(_COLUMN_EXISTS, {"table": "users", "column": "role"}).scalar():
                 print("✅ Role column already exists")
-                return True
-            except ProgrammingError:
+            else:
                 print("📝 Role column doesn't exist, adding it...")
-                
-                # Add role column
-                conn.execute(text("ALTER TABLE users ADD COLUMN role VARCHAR(50)"))
-                conn.commit()
+                conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS role VARCHAR(50)"))
                 print("✅ Role column added successfully")
-                return True
-                
+
+            # Webhook payload digest column
+            if conn.execute(_COLUMN_EXISTS, {"table": "webhook_events", "column": "payload_sha256"}).scalar():
+                print("✅ payload_sha256 column already exists")
+            else:
+                print("📝 Adding payload_sha256 column...")
+                conn.execute(text("ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS payload_sha256 VARCHAR(64)"))
+                print("✅ payload_sha256 column added")
+
+            # Stripe lookup indexes
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_users_stripe_customer_id "
+                "ON users (stripe_customer_id)"
+            ))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_webhook_events_stripe_event_id "
+                "ON webhook_events (stripe_event_id)"
+            ))
+            # Composite indexes for admin usage/audit scans
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_usage_date_user "
+                "ON usage_counters (date, user_id)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_audit_email_created "
+                "ON membership_audit (email, created_at)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_usage_date_checks "
+                "ON usage_counters (date, daily_checks_used)"
+            ))
+            print("✅ Stripe lookup indexes ensured")
+
+        return True
+
     except Exception as e:
         print(f"❌ Migration failed: {e}")
         return False
@@ -1,14 +1,28 @@
+import numpy as np
 import pandas as pd
 
 CSV_PATH = 'masterfile_claims.csv'
 UPDATED_CSV_PATH = 'masterfile_claims_UPDATED.csv'
+CHUNK_ROWS = 100_000
 
 def update_camu_camu_vitc_dosage():
-    df = pd.read_csv(CSV_PATH)
-    mask = df['Ingredient'].str.contains('camu camu', case=False, na=False) & df['Claim'].str.contains('vitamin c', case=False, na=False)
-    df.loc[mask, 'Dosage'] = '≥ 12 mg vitamin C per serving'
-    df.to_csv(UPDATED_CSV_PATH, index=False)
-    print(f"Updated {mask.sum()} rows. Saved to {UPDATED_CSV_PATH}")
+    # The edit is row-local, so stream the file in chunks and append each
+    # one to the output — memory stays O(chunk) instead of O(file)
+    updated = 0
+    first = True
+    for chunk in pd.read_csv(CSV_PATH, dtype_backend="pyarrow", chunksize=CHUNK_ROWS):
+        # regex=False takes the C substring-search path instead of a Python
+        # regex per cell, and the Claim scan only runs on rows that already
+        # matched on Ingredient
+        ingredient_hit = chunk['Ingredient'].str.contains('camu camu', case=False, regex=False, na=False)
+        idx = np.flatnonzero(ingredient_hit.to_numpy())
+        claim_hit = chunk['Claim'].iloc[idx].str.contains('vitamin c', case=False, regex=False, na=False)
+        matched = idx[claim_hit.to_numpy()]
+        chunk.iloc[matched, chunk.columns.get_loc('Dosage')] = '≥ 12 mg vitamin C per serving'
+        chunk.to_csv(UPDATED_CSV_PATH, index=False, header=first, mode='w' if first else 'a')
+        updated += len(matched)
+        first = False
+    print(f"Updated {updated} rows. Saved to {UPDATED_CSV_PATH}")
 
 if __name__ == '__main__':
     update_camu_camu_vitc_dosage()
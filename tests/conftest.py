@@ -0,0 +1,107 @@
+import os
+
+# Minimum bcrypt cost for the app-side hashing paths (activation,
+# password change): tests only need hashes that verify, and app.security
+# reads this at import time — conftest runs before any test module
+# imports the app
+os.environ.setdefault("BCRYPT_COST", "4")
+
+# Under pytest-xdist (pytest -n auto --dist=loadscope) every worker gets
+# its own SQLite file for the shared app engine, keyed off the worker id
+# that xdist exports before conftest import; the in-memory engine below
+# is per-process already. Serial runs keep the default DATABASE_URL.
+_worker = os.environ.get("PYTEST_XDIST_WORKER")
+if _worker and "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///./test_{_worker}.db"
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db import engine
+from app.models import Base
+
+@pytest.fixture(scope="session", autouse=True)
+def _schema():
+    """Create the shared-engine schema once for the whole run.
+
+    Individual tests get isolation from _fresh_tables below; repeating
+    drop_all/create_all around every test made DDL the dominant cost of
+    the suite.
+    """
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+    if _worker:
+        engine.dispose()
+        worker_db = f"./test_{_worker}.db"
+        if os.path.exists(worker_db):
+            os.remove(worker_db)
+
+@pytest.fixture(autouse=True)
+def _fresh_tables():
+    """Give each test empty tables without per-test DDL.
+
+    create_all is a cheap no-op when the tables already exist (checkfirst),
+    which keeps modules that still drop tables themselves from breaking
+    their neighbours; the deletes then clear rows in FK-reverse order.
+    """
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    yield
+
+@pytest.fixture(scope="session")
+def memory_engine():
+    """One in-memory SQLite engine shared by all service-layer tests.
+
+    StaticPool keeps a single connection alive for the whole run, so the
+    per-test engine create/dispose and first-connection cost disappear.
+    The PRAGMAs drop durability work that means nothing for :memory:,
+    and taking over transaction control from pysqlite is what makes the
+    SAVEPOINT-based isolation in the db fixture below work.
+    """
+    mem = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    @event.listens_for(mem, "connect")
+    def _on_connect(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(mem, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(bind=mem)
+    yield mem
+    mem.dispose()
+
+@pytest.fixture
+def db(memory_engine):
+    """Session on the shared in-memory engine, isolated per test.
+
+    The session joins an outer transaction that is rolled back in
+    teardown; commits inside the test become SAVEPOINTs, so no DDL or
+    row cleanup is needed between tests.
+    """
+    connection = memory_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=connection,
+        join_transaction_mode="create_savepoint",
+    )()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
@@ -1,62 +1,76 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
-from app.models import Base, User, Tier
-from app.db import SessionLocal, engine
-from app.services.usage import increment_daily_checks
+from app.dependencies import get_current_user
+from app.models import User, UsageCounter, Tier
+from app.db import SessionLocal
 from datetime import datetime, timedelta
 
-@pytest.fixture(autouse=True)
-def setup_db():
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client():
     return TestClient(app)
 
-def test_admin_usage_html(client, monkeypatch):
+@pytest.fixture
+def auth_as():
+    # FastAPI's override hook instead of monkeypatching app.dependencies;
+    # require_role resolves through get_current_user, so overriding the
+    # root dependency with the cached admin covers the whole chain
+    def _set(user):
+        app.dependency_overrides[get_current_user] = lambda: user
+    yield _set
+    app.dependency_overrides.pop(get_current_user, None)
+
+def test_admin_usage_html(client, auth_as):
     db = SessionLocal()
-    for i in range(3):
-        user = User(email=f"user{i}@ex.com", tier=Tier.starter, is_active=True, password_hash="x", role="user")
-        db.add(user)
-        db.commit()
-        for _ in range(i+1):
-            increment_daily_checks(db, user.id)
-    admin = User(email="admin@ex.com", tier=Tier.enterprise, is_active=True, password_hash="x", role="admin")
-    db.add(admin)
+    db.bulk_insert_mappings(
+        User,
+        [
+            {"email": f"user{i}@ex.com", "tier": Tier.starter, "is_active": True, "password_hash": "x", "role": "user"}
+            for i in range(3)
+        ]
+        + [{"email": "admin@ex.com", "tier": Tier.enterprise, "is_active": True, "password_hash": "x", "role": "admin"}],
+    )
+    ids = dict(db.query(User.email, User.id).all())
+    today = datetime.utcnow().date()
+    db.bulk_insert_mappings(
+        UsageCounter,
+        [
+            {"user_id": ids[f"user{i}@ex.com"], "date": today, "daily_checks_used": i + 1}
+            for i in range(3)
+        ],
+    )
     db.commit()
+    admin = db.query(User).filter_by(email="admin@ex.com").first()
+    db.expunge(admin)
     db.close()
-    def fake_require_role(role):
-        def dep(*a, **k):
-            return admin
-        return dep
-    monkeypatch.setattr("app.dependencies.require_role", fake_require_role)
+    auth_as(admin)
     resp = client.get("/admin/usage")
     assert resp.status_code == 200
     assert "user2@ex.com" in resp.text
 
-def test_user_usage_history(client, monkeypatch):
+def test_user_usage_history(client, auth_as):
     db = SessionLocal()
-    user = User(email="userx@ex.com", tier=Tier.starter, is_active=True, password_hash="x", role="user")
-    db.add(user)
-    db.commit()
+    db.bulk_insert_mappings(
+        User,
+        [
+            {"email": "userx@ex.com", "tier": Tier.starter, "is_active": True, "password_hash": "x", "role": "user"},
+            {"email": "admin@ex.com", "tier": Tier.enterprise, "is_active": True, "password_hash": "x", "role": "admin"},
+        ],
+    )
+    user_id = db.query(User.id).filter_by(email="userx@ex.com").scalar()
     today = datetime.utcnow().date()
-    for i in range(7):
-        from app.models import UsageCounter
-        uc = UsageCounter(user_id=user.id, date=today - timedelta(days=i), daily_checks_used=i)
-        db.add(uc)
-    admin = User(email="admin@ex.com", tier=Tier.enterprise, is_active=True, password_hash="x", role="admin")
-    db.add(admin)
+    db.bulk_insert_mappings(
+        UsageCounter,
+        [
+            {"user_id": user_id, "date": today - timedelta(days=i), "daily_checks_used": i}
+            for i in range(7)
+        ],
+    )
     db.commit()
+    admin = db.query(User).filter_by(email="admin@ex.com").first()
+    db.expunge(admin)
     db.close()
-    def fake_require_role(role):
-        def dep(*a, **k):
-            return admin
-        return dep
-    monkeypatch.setattr("app.dependencies.require_role", fake_require_role)
+    auth_as(admin)
     resp = client.get(f"/admin/users/userx@ex.com/usage?days=7")
     assert resp.status_code == 200
     data = resp.json()
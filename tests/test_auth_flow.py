@@ -1,27 +1,42 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.models import Base, User, Tier
+from app.models import User, Tier
 from app.auth import sign_activation_token, sign_magic_token
 from app.main import app
 from app.db import get_db
 from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+import re
 
-@pytest.fixture
-def db():
-    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    yield db
-    db.close()
-    engine.dispose()
+TOKEN_RE = re.compile(r'token=([\w.-]+)')
 
-@pytest.fixture
+# Hashed once at import with a single pbkdf2 iteration — the login path
+# only needs a verifiable hash, not a production-strength one
+_PW_HASH = generate_password_hash("pw123456", method="pbkdf2:sha256:1")
+
+@pytest.fixture(scope="module")
+def db(memory_engine):
+    # Module-scoped variant of conftest's db fixture so it can back the
+    # module-scoped client below; the rollback wipes this module's rows
+    connection = memory_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=connection,
+        join_transaction_mode="create_savepoint",
+    )()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+@pytest.fixture(scope="module")
 def client(db):
     app.dependency_overrides[get_db] = lambda: db
-    return TestClient(app)
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
 
 def test_onboarding_and_activation(client, db):
     # Simulate webhook: create inactive user
@@ -33,22 +48,21 @@ def test_onboarding_and_activation(client, db):
     resp = client.get(f"/auth/activate?token={token}")
     assert resp.status_code == 200
     # POST activation
-    resp = client.post("/auth/activate", data={"token": token, "password": "secret123"}, allow_redirects=False)
+    resp = client.post("/auth/activate", data={"token": token, "password": "secret123"}, follow_redirects=False)
     assert resp.status_code == 302
     db.refresh(user)
     assert user.is_active
     assert user.password_hash is not None
 
 def test_login_and_dashboard(client, db):
-    from werkzeug.security import generate_password_hash
-    user = User(email="login@ex.com", tier=Tier.pro, is_active=True, password_hash=generate_password_hash("pw123456"))
+    user = User(email="login@ex.com", tier=Tier.pro, is_active=True, password_hash=_PW_HASH)
     db.add(user)
     db.commit()
     # GET login form
     resp = client.get("/login")
     assert resp.status_code == 200
     # POST login
-    resp = client.post("/login", data={"email": "login@ex.com", "password": "pw123456"}, allow_redirects=False)
+    resp = client.post("/login", data={"email": "login@ex.com", "password": "pw123456"}, follow_redirects=False)
     assert resp.status_code == 302
     assert "session=" in resp.headers.get("set-cookie", "")
     # Access dashboard
@@ -62,23 +76,22 @@ def test_login_and_dashboard(client, db):
     assert resp.status_code == 401
 
 def test_magic_link_flow(client, db):
-    from werkzeug.security import generate_password_hash
-    user = User(email="magic@ex.com", tier=Tier.starter, is_active=True, password_hash=generate_password_hash("pw123456"))
+    user = User(email="magic@ex.com", tier=Tier.starter, is_active=True, password_hash=_PW_HASH)
     db.add(user)
     db.commit()
     # POST magic link
-    with patch("app.utils.send_email") as mock_send:
+    # Patch the name app.auth actually calls, not the defining module
+    with patch("app.auth.send_email") as mock_send:
         resp = client.post("/auth/magic-link", data={"email": "magic@ex.com"})
         assert resp.status_code == 200
         assert mock_send.called
         # Extract token from email body
         html = mock_send.call_args[0][2]
-        import re
-        m = re.search(r'token=([\w\.-]+)', html)
+        m = TOKEN_RE.search(html)
         assert m
         token = m.group(1)
     # GET magic login
-    resp = client.get(f"/auth/magic-login?token={token}", allow_redirects=False)
+    resp = client.get(f"/auth/magic-login?token={token}", follow_redirects=False)
     assert resp.status_code == 302
     assert "session=" in resp.headers.get("set-cookie", "")
     # Access dashboard
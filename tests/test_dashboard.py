@@ -1,31 +1,38 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
-from app.models import Base, User, Tier
-from app.db import SessionLocal, engine
+from app.models import User, Tier
+from app.db import SessionLocal
 from sqlalchemy.orm import sessionmaker
 from werkzeug.security import generate_password_hash
 import os
+import re
 
-@pytest.fixture(autouse=True)
-def setup_db():
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
+CSRF_RE = re.compile(r'name="csrf_token" value="([^"]+)"')
 
-@pytest.fixture
+# Hash once at import: the default pbkdf2 iteration count makes per-user
+# hashing the slowest part of fixture setup, and every test user shares
+# the same password anyway
+_PW_HASH = generate_password_hash("pw123456", method="pbkdf2:sha256:1")
+
+@pytest.fixture(scope="module")
 def client():
     return TestClient(app)
 
-def login_session(client, email, tier=Tier.starter, stripe_customer_id=None):
+@pytest.fixture
+def app_db():
+    # One session on the app engine per test, reused for seeding and
+    # assertions instead of an open/close pair in each helper
     db = SessionLocal()
+    yield db
+    db.close()
+
+def login_session(client, db, email, tier=Tier.starter, stripe_customer_id=None):
     user = db.query(User).filter_by(email=email).first()
     if not user:
-        user = User(email=email, tier=tier, is_active=True, password_hash=generate_password_hash("pw123456"), role="user", stripe_customer_id=stripe_customer_id)
+        user = User(email=email, tier=tier, is_active=True, password_hash=_PW_HASH, role="user", stripe_customer_id=stripe_customer_id)
         db.add(user)
         db.commit()
-    db.close()
     # Simulate login by setting session cookie
     from itsdangerous import URLSafeTimedSerializer
     secret = os.getenv("SESSION_SECRET", "dev-session-secret")
@@ -38,46 +45,45 @@ def test_dashboard_requires_login(client):
     resp = client.get("/dashboard")
     assert resp.status_code == 401
 
-def test_dashboard_shows_user_info(client):
-    login_session(client, "dash@ex.com", Tier.pro)
+def test_dashboard_shows_user_info(client, app_db):
+    login_session(client, app_db, "dash@ex.com", Tier.pro)
     resp = client.get("/dashboard")
     assert resp.status_code == 200
     assert "dash@ex.com" in resp.text
     assert "Pro" in resp.text or "pro" in resp.text
 
-def test_billing_portal_redirect(client, monkeypatch):
-    user = login_session(client, "bill@ex.com", Tier.starter, stripe_customer_id="cus_123")
+def test_billing_portal_redirect(client, app_db, monkeypatch):
+    user = login_session(client, app_db, "bill@ex.com", Tier.starter, stripe_customer_id="cus_123")
     class FakeSession:
         url = "https://stripe-portal.test/session"
     monkeypatch.setattr("stripe.billing_portal.Session.create", lambda **kwargs: FakeSession())
     # Get CSRF token
     resp = client.get("/billing")
     assert resp.status_code == 200
-    import re
-    m = re.search(r'name="csrf_token" value="([^"]+)"', resp.text)
+    m = CSRF_RE.search(resp.text)
     assert m
     csrf_token = m.group(1)
     # Post to portal
-    resp2 = client.post("/billing/portal", data={"csrf_token": csrf_token}, allow_redirects=False)
+    resp2 = client.post("/billing/portal", data={"csrf_token": csrf_token}, follow_redirects=False)
     assert resp2.status_code == 303
     assert resp2.headers["location"].startswith("https://stripe-portal.test/")
 
-def test_change_password_csrf(client):
-    login_session(client, "pw@ex.com", Tier.starter)
+def test_change_password_csrf(client, app_db):
+    login_session(client, app_db, "pw@ex.com", Tier.starter)
     # No CSRF
-    resp = client.post("/account/change-password", data={"current_password": "pw123456", "new_password": "newpass123"})
+    resp = client.post("/account/change-password", data={"current_password": "pw123456", "new_password": "Newpass123"})
     assert resp.status_code == 403
     # With CSRF
     resp = client.get("/account")
-    import re
-    m = re.search(r'name="csrf_token" value="([^"]+)"', resp.text)
+    m = CSRF_RE.search(resp.text)
     csrf_token = m.group(1)
-    resp2 = client.post("/account/change-password", data={"csrf_token": csrf_token, "current_password": "pw123456", "new_password": "newpass123"}, allow_redirects=False)
+    resp2 = client.post("/account/change-password", data={"csrf_token": csrf_token, "current_password": "pw123456", "new_password": "Newpass123"}, follow_redirects=False)
     assert resp2.status_code == 303
-    # Password actually changed
-    db = SessionLocal()
-    user = db.query(User).filter_by(email="pw@ex.com").first()
+    # Password actually changed — expire the identity map so the re-query
+    # sees the write made through the app's own session
+    app_db.expire_all()
+    user = app_db.query(User).filter_by(email="pw@ex.com").first()
     assert user is not None
-    from werkzeug.security import check_password_hash
-    assert check_password_hash(user.password_hash, "newpass123")
-    db.close()
+    # The app re-hashes with bcrypt, so verify through its own helper
+    from app.security import verify_password
+    assert verify_password("Newpass123", user.password_hash)
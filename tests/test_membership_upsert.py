@@ -1,23 +1,12 @@
-import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.models import Base, Tier, User, MembershipAudit
+from app.models import Tier, User, MembershipAudit
 from app.services.memberships import upsert_membership_from_checkout, upsert_membership_from_subscription
 from app.repository import get_user_by_email
-from app.billing import PRICE_TO_TIER
+from app.billing import TIER_TO_PRICE
 
-@pytest.fixture
-def db():
-    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    yield db
-    db.close()
-    engine.dispose()
+# db comes from conftest: shared in-memory engine, per-test rollback
 
-PRO_PRICE = next(pid for pid, tier in PRICE_TO_TIER.items() if tier == Tier.pro)
-STARTER_PRICE = next(pid for pid, tier in PRICE_TO_TIER.items() if tier == Tier.starter)
+PRO_PRICE = TIER_TO_PRICE[Tier.pro]
+STARTER_PRICE = TIER_TO_PRICE[Tier.starter]
 
 
 def test_checkout_upsert_creates_user(db):
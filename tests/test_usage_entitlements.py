@@ -1,24 +1,9 @@
-import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.models import Base, Tier
+from app.models import Tier
 from app.services.entitlements import get_entitlements, max_daily_checks
 from app.repository import create_user
 from app.services.usage import get_or_create_today_counter, increment_daily_checks, remaining_daily_checks
 
-def setup_db():
-    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.create_all(bind=engine)
-    return engine, TestingSessionLocal
-
-@pytest.fixture
-def db():
-    engine, TestingSessionLocal = setup_db()
-    db = TestingSessionLocal()
-    yield db
-    db.close()
-    engine.dispose()
+# db comes from conftest: shared in-memory engine, per-test rollback
 
 def test_entitlements_loading():
     for tier in [Tier.free, Tier.starter, Tier.pro, Tier.enterprise]:
@@ -1,23 +1,9 @@
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.models import Base, Tier
+from app.models import Tier
 from app.repository import create_user, get_user_by_email, upsert_user_by_email
 from app.services.users import find_or_create_by_email, set_user_tier
 
-def setup_db():
-    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.create_all(bind=engine)
-    return engine, TestingSessionLocal
-
-@pytest.fixture
-def db():
-    engine, TestingSessionLocal = setup_db()
-    db = TestingSessionLocal()
-    yield db
-    db.close()
-    engine.dispose()
+# db comes from conftest: shared in-memory engine, per-test rollback
 
 def test_email_normalization_and_uniqueness(db):
     user1 = create_user(db, email="Test@Example.com ", tier=Tier.starter)
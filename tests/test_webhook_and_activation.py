@@ -5,6 +5,9 @@ from app.models import User, WebhookEvent, Tier, Base
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from unittest.mock import patch
+import re
+
+TOKEN_RE = re.compile(r'token=([\w.-]+)')
 
 # Use in-memory SQLite for tests
 TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -60,8 +63,7 @@ def test_webhook_and_activation(monkeypatch):
         assert sent["to"] == "testuser@example.com"
         assert "Activate" in sent["subject"]
         # Extract token from email
-        import re
-        m = re.search(r'token=([\w\.-]+)', sent["html"])
+        m = TOKEN_RE.search(sent["html"])
         assert m
         token = m.group(1)
         # GET /auth/activate